@@ -0,0 +1,19 @@
+"""
+Gunicorn settings for serving the web UI in production:
+    gunicorn -c gunicorn.conf.py newsapp:app
+"""
+
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# gevent workers yield while waiting on NewsData.io, so each one handles many requests at once
+worker_class = "gevent"
+workers = int(os.getenv("WEB_CONCURRENCY", 4))
+worker_connections = 1000
+
+def post_worker_init(worker):
+    """Warms the cache once each worker has loaded the app."""
+    # Each worker has its own in-process cache unless Redis is configured; with Redis,
+    # warm_cache()'s shared flag makes every worker but the first skip the pass
+    from newsapp import start_cache_warming
+    start_cache_warming()
@@ -1,20 +1,36 @@
 #!/usr/bin/env python3
 """
-News Headlines App with NewsData.io Official Python Client:
+News Headlines App using the NewsData.io REST API:
 Terminal UI or Flask Web UI with Caching and Search.
 """
 
 import os
+import sys
 import argparse
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, zip_longest
+import hashlib
+import json
 import logging
+import threading
+import time
+from functools import lru_cache
 from datetime import datetime, timezone
-from newsdataapi import NewsDataApiClient
-from flask import Flask, request, render_template, Response
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask, request, stream_template, Response
+from flask_compress import Compress
 from rich.console import Console
 from rich.table import Table
 from rich.text import Text
 from dotenv import load_dotenv
-from cachelib import SimpleCache
+from cachelib import RedisCache, SimpleCache
+from redis.backoff import NoBackoff
+from redis.exceptions import RedisError
+from redis.retry import Retry as RedisRetry
 
 # --- Configuration & Initialization ---
 load_dotenv()
@@ -25,57 +41,172 @@ if not API_KEY:
     raise RuntimeError("NEWSDATA_API_KEY not found in environment. Please create a .env file.")
 
 app = Flask(__name__)
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"] # Prefer Brotli, fall back to gzip
+app.config["COMPRESS_MIN_SIZE"] = 500
+# Leave streamed pages uncompressed: the compressor would hold the whole page back anyway
+app.config["COMPRESS_STREAMS"] = False
+Compress(app)
 console = Console()
-api_client = NewsDataApiClient(apikey=API_KEY)
-cache = SimpleCache(threshold=500, default_timeout=600) # Cache for 10 minutes
 
-VALID_CATEGORIES = {
+NEWSDATA_LATEST_URL = "https://newsdata.io/api/1/latest"
+UPSTREAM_TIMEOUT = 10 # Seconds allowed for each connect and read
+UPSTREAM_RETRIES = 3
+UPSTREAM_BACKOFF = 0.3
+# Worst case for one fetch: every attempt timing out on both connect and read, plus backoff sleeps
+UPSTREAM_BUDGET = (UPSTREAM_RETRIES + 1) * 2 * UPSTREAM_TIMEOUT + sum(
+    UPSTREAM_BACKOFF * 2 ** i for i in range(UPSTREAM_RETRIES)
+)
+
+# Shared keep-alive session so repeated calls reuse pooled TLS connections
+http_session = requests.Session()
+# The key goes in a header so it never appears in URLs, exception messages or logs
+http_session.headers.update({"Connection": "keep-alive", "X-ACCESS-KEY": API_KEY})
+http_session.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(
+        total=UPSTREAM_RETRIES, backoff_factor=UPSTREAM_BACKOFF, status_forcelist=(500, 502, 503, 504)
+    ),
+))
+
+CACHE_TTL = 600 # Entries are fresh for 10 minutes...
+CACHE_MAX_AGE = 3600 # ...then served stale while being revalidated for up to an hour
+
+class FailSafeRedisCache(RedisCache):
+    """RedisCache that logs Redis outages and treats them as cache misses instead of raising."""
+
+    def _guard(self, operation, default, *args, **kwargs):
+        try:
+            return getattr(super(), operation)(*args, **kwargs)
+        except RedisError as e:
+            logging.warning(f"Redis cache {operation} failed, treating as a miss: {e}")
+            return default
+
+    def get(self, key):
+        return self._guard("get", None, key)
+
+    def set(self, key, value, timeout=None):
+        return self._guard("set", False, key, value, timeout)
+
+    def add(self, key, value, timeout=None):
+        return self._guard("add", False, key, value, timeout)
+
+    def delete(self, key):
+        return self._guard("delete", False, key)
+
+def create_cache():
+    """Uses Redis as a cache shared by all workers when configured, else an in-process cache."""
+    redis_host = os.getenv("REDIS_HOST")
+    if redis_host:
+        redis_cache = FailSafeRedisCache(
+            host=redis_host,
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            default_timeout=CACHE_MAX_AGE,
+            key_prefix="news:",
+            # Fail fast during an outage rather than retrying on every cache call
+            socket_connect_timeout=2,
+            socket_timeout=2,
+            retry=RedisRetry(NoBackoff(), 0),
+        )
+        try:
+            redis_cache._write_client.ping()
+            logging.info(f"Using Redis cache at {redis_host}")
+            return redis_cache
+        except RedisError as e:
+            logging.warning(f"Redis at {redis_host} unavailable ({e}), using in-process cache")
+    return SimpleCache(threshold=500, default_timeout=CACHE_MAX_AGE)
+
+cache = create_cache()
+_refresh_lock = threading.Lock()
+
+# Upstream fetches currently running in this process, keyed by cache key
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+VALID_CATEGORIES = frozenset({
     "business", "crime", "domestic", "education", "entertainment", "environment",
     "food", "health", "lifestyle", "other", "politics", "science", "sports",
     "technology", "top", "tourism", "world"
-}
-VALID_COUNTRY_CODES = {
+})
+VALID_COUNTRY_CODES = frozenset({
     "us", "gb", "ca", "de", "fr", "ro", "in", "au", "cn", "jp", "kr", "za", "br", "mx"
-}
+})
+# Sorted once for the web form's dropdowns
+VALID_CATEGORIES_SORTED = sorted(VALID_CATEGORIES)
+VALID_COUNTRY_CODES_SORTED = sorted(VALID_COUNTRY_CODES)
+
+# Resolved once instead of re-reading the system timezone for every article
+LOCAL_TZ = datetime.now().astimezone().tzinfo
+
+# Popular (category, country) combinations fetched at startup so first visitors hit the cache
+WARM_COMBOS = [
+    (None, None), ("top", None), ("technology", None), ("business", None),
+    ("sports", None), ("world", None), ("top", "us"), ("technology", "us"),
+    ("business", "us"), ("top", "gb"), ("sports", "gb"), ("top", "in"),
+]
 
 # --- Core Logic ---
 
+@lru_cache(maxsize=4096) # Articles in a batch often share timestamps
 def format_date(date_string):
     """Formats an ISO date string into a user-friendly format."""
     if not date_string:
         return None
     try:
-        # Works for formats like "2023-08-29 12:34:56"
-        dt_object = datetime.strptime(date_string, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-        return dt_object.astimezone().strftime('%d %b %Y, %H:%M')
+        # Works for formats like "2023-08-29 12:34:56"; fromisoformat is far faster than strptime
+        dt_object = datetime.fromisoformat(date_string)
+        if dt_object.tzinfo is None: # NewsData.io timestamps are naive UTC
+            dt_object = dt_object.replace(tzinfo=timezone.utc)
+        return dt_object.astimezone(LOCAL_TZ).strftime('%d %b %Y, %H:%M')
     except (ValueError, TypeError):
         logging.warning(f"Could not parse date: {date_string}")
         return date_string
 
-def fetch_headlines(q=None, category=None, country=None, language="en", limit=10):
-    """Fetches news from API, with caching."""
-    params = {
-        "q": q,
-        "category": category if category and category.lower() in VALID_CATEGORIES else None,
-        "country": country if country and country.lower() in VALID_COUNTRY_CODES else None,
-        "language": language or "en",
-    }
-    # Remove None values so they aren't sent to the API
-    params = {k: v for k, v in params.items() if v}
-    
-    # Create a unique cache key based on the request parameters
-    cache_key = f"news-{hash(frozenset(params.items()))}"
-    cached_result = cache.get(cache_key)
-    if cached_result:
-        logging.info(f"Serving from cache for key: {cache_key}")
-        return cached_result[:limit], None
+def make_cache_key(prefix, params):
+    """Builds a cache key that is stable across processes and restarts."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return f"{prefix}-{hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()}"
+
+def sanitize_category(cat):
+    """Returns the lowercased category if it is supported, else None."""
+    if not cat:
+        return None
+    c = cat.lower()
+    return c if c in VALID_CATEGORIES else None
+
+def sanitize_country(code):
+    """Returns the lowercased country code if it is supported, else None."""
+    if not code:
+        return None
+    c = code.lower()
+    return c if c in VALID_COUNTRY_CODES else None
+
+def fetch_from_api(params, cache_key, cached_entry=None):
+    """Fetches news from the API and stores it in the cache, revalidating any previous entry."""
+    etag, last_modified, cached_results = None, None, None
+    if cached_entry:
+        _, etag, last_modified, cached_results = cached_entry
+
+    # Revalidate an expired entry instead of re-downloading an unchanged feed
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
 
     logging.info(f"Fetching from API with params: {params}")
     try:
-        response = api_client.latest_api(**params)
+        resp = http_session.get(
+            NEWSDATA_LATEST_URL, params=params, headers=headers, timeout=UPSTREAM_TIMEOUT
+        )
+        if resp.status_code == 304 and cached_results is not None:
+            logging.info(f"Upstream not modified, refreshing cache for key: {cache_key}")
+            cache.set(cache_key, (time.time(), etag, last_modified, cached_results))
+            return cached_results, None
+        response = orjson.loads(resp.content)
     except Exception as e:
-        logging.error(f"Error fetching from NewsData API: {e}")
-        return None, f"Error communicating with the news service: {e}"
+        logging.error(f"Error fetching from NewsData API: {type(e).__name__}: {e}")
+        return None, "Error communicating with the news service. Please try again later."
 
     if response.get("status") != "success":
         error_msg = f"API error: {response.get('results', {}).get('message', 'Unknown error')}"
@@ -86,11 +217,145 @@ def fetch_headlines(q=None, category=None, country=None, language="en", limit=10
     for article in results:
         article['pubDate_formatted'] = format_date(article.get("pubDate"))
 
-    cache.set(cache_key, results)
+    cache.set(cache_key, (time.time(), resp.headers.get("ETag"), resp.headers.get("Last-Modified"), results))
+    return results, None
+
+def fetch_coalesced(params, cache_key):
+    """Fetches from the API, letting concurrent callers for the same key share a single request."""
+    with _inflight_lock:
+        flight = _inflight.get(cache_key)
+        is_leader = flight is None
+        if is_leader:
+            flight = _inflight[cache_key] = {"done": threading.Event(), "result": None}
+
+    if not is_leader:
+        logging.info(f"Waiting for in-flight fetch for key: {cache_key}")
+        # Allow the leader its full retry budget so we don't give up on a fetch that may still succeed
+        if not flight["done"].wait(timeout=UPSTREAM_BUDGET + 5):
+            return None, "Timed out waiting for the news service."
+        return flight["result"]
+
+    # Followers get this if the leader fails with an unexpected exception
+    result = (None, "Error communicating with the news service. Please try again later.")
+    try:
+        # A previous leader may have cached the result just before we took over
+        cached_entry = cache.get(cache_key)
+        if cached_entry:
+            logging.info(f"Serving from cache for key: {cache_key}")
+            result = (cached_entry[3], None)
+        else:
+            result = fetch_from_api(params, cache_key)
+    finally:
+        flight["result"] = result
+        with _inflight_lock:
+            del _inflight[cache_key]
+        flight["done"].set()
+    return result
+
+def refresh_in_background(params, cache_key, cached_entry):
+    """Starts a background refresh of a stale entry unless one is already running."""
+    refresh_key = f"{cache_key}:refreshing"
+    # The in-flight flag lives in the cache so it also guards other workers sharing Redis
+    with _refresh_lock:
+        # Outlive the slowest possible fetch so a second refresh can't start meanwhile
+        if not cache.add(refresh_key, True, timeout=int(UPSTREAM_BUDGET) + 5):
+            return
+
+    def refresh():
+        try:
+            fetch_from_api(params, cache_key, cached_entry)
+        finally:
+            cache.delete(refresh_key)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+def fetch_headlines(q=None, category=None, country=None, language="en", limit=10):
+    """Fetches news from API, with stale-while-revalidate caching."""
+    params = {
+        "q": q,
+        "category": sanitize_category(category),
+        "country": sanitize_country(country),
+        "language": language or "en",
+    }
+    # Remove None values so they aren't sent to the API
+    params = {k: v for k, v in params.items() if v}
+    
+    cache_key = make_cache_key("news", params)
+    cached_entry = cache.get(cache_key)
+    if cached_entry:
+        fetched_at, _, _, cached_results = cached_entry
+        if time.time() - fetched_at < CACHE_TTL:
+            logging.info(f"Serving from cache for key: {cache_key}")
+        else:
+            logging.info(f"Serving stale cache and refreshing in background for key: {cache_key}")
+            refresh_in_background(params, cache_key, cached_entry)
+        return cached_results[:limit], None
+
+    results, error = fetch_coalesced(params, cache_key)
+    if error:
+        return None, error
     return results[:limit], None
 
+def fetch_headlines_multi(categories, q=None, country=None, language="en", limit=10):
+    """Fetches several categories concurrently and interleaves their articles."""
+    with ThreadPoolExecutor(max_workers=min(len(categories), 8)) as executor:
+        fetched = list(executor.map(
+            lambda category: fetch_headlines(q, category, country, language, limit), categories
+        ))
+
+    article_lists = [articles for articles, error in fetched if not error]
+    errors = [error for _, error in fetched if error]
+    if not article_lists:
+        return None, errors[0]
+    for error in errors:
+        logging.warning(f"Skipping a category after error: {error}")
+
+    # Round-robin across categories, dropping articles that appear in more than one
+    merged, seen = [], set()
+    for article in chain.from_iterable(zip_longest(*article_lists)):
+        if article is None:
+            continue
+        article_id = article.get("article_id") or article.get("link")
+        if article_id in seen:
+            continue
+        seen.add(article_id)
+        merged.append(article)
+    return merged[:limit], None
+
+def warm_cache():
+    """Pre-fetches headlines for the most common category/country combinations."""
+    # Skip if another process sharing the cache (e.g. another host on Redis) warmed it recently
+    if not cache.add("warm-cache", True, timeout=CACHE_TTL):
+        logging.info("Cache was warmed recently, skipping")
+        return
+    for category, country in WARM_COMBOS:
+        _, error = fetch_headlines(category=category, country=country)
+        if error:
+            logging.warning(f"Cache warming stopped at {category}/{country}: {error}")
+            return
+    logging.info(f"Cache warmed for {len(WARM_COMBOS)} combinations")
+
+def start_cache_warming():
+    """Warms the cache on a background thread so server startup isn't delayed."""
+    threading.Thread(target=warm_cache, daemon=True).start()
+
 # --- Terminal UI (TUI) Mode ---
 
+# Column layout for the headlines table, defined once rather than per call
+HEADLINE_COLUMNS = (
+    ("#", {"justify": "right", "style": "dim", "width": 3}),
+    ("Title", {"style": "bold white", "min_width": 40}),
+    ("Source", {"style": "yellow"}),
+    ("Published At", {"style": "green", "no_wrap": True}),
+)
+
+def new_headlines_table(title):
+    """Creates an empty headlines table with the standard columns."""
+    table = Table(title=title, show_lines=True, header_style="bold magenta")
+    for name, options in HEADLINE_COLUMNS:
+        table.add_column(name, **options)
+    return table
+
 def print_headlines_rich(articles, query_info):
     """Prints news articles to the terminal using rich."""
     if not articles:
@@ -98,11 +363,7 @@ def print_headlines_rich(articles, query_info):
         return
 
     title = f"Latest News Headlines for: [bold cyan]{query_info}[/bold cyan]"
-    table = Table(title=title, show_lines=True, header_style="bold magenta")
-    table.add_column("#", justify="right", style="dim", width=3)
-    table.add_column("Title", style="bold white", min_width=40)
-    table.add_column("Source", style="yellow")
-    table.add_column("Published At", style="green", no_wrap=True)
+    table = new_headlines_table(title)
 
     for i, article in enumerate(articles, 1):
         table.add_row(
@@ -120,10 +381,24 @@ def print_headlines_rich(articles, query_info):
 
 def run_terminal_mode(args):
     """Runs the application in terminal mode."""
-    query_parts = [args.query, args.category, args.country, args.language]
+    categories = []
+    for name in (args.categories.split(",") if args.categories else []):
+        if not name.strip():
+            continue
+        if category := sanitize_category(name.strip()):
+            categories.append(category)
+        else:
+            console.print(f"[bold yellow]WARNING:[/bold yellow] Ignoring unknown category '{name.strip()}'")
+    if args.categories and not categories:
+        console.print("[bold red]ERROR:[/bold red] None of the requested categories are supported.")
+        return
+    query_parts = [args.query, ", ".join(categories) or args.category, args.country, args.language]
     query_info = ' | '.join(filter(None, query_parts)) or "General"
     
-    articles, error = fetch_headlines(args.query, args.category, args.country, args.language, args.limit)
+    if categories:
+        articles, error = fetch_headlines_multi(categories, args.query, args.country, args.language, args.limit)
+    else:
+        articles, error = fetch_headlines(args.query, args.category, args.country, args.language, args.limit)
     
     if error:
         console.print(f"[bold red]ERROR:[/bold red] {error}")
@@ -142,9 +417,20 @@ def run_terminal_mode(args):
 
 # --- Flask Web UI Mode ---
 
-@app.route("/")
-def news_web():
-    """Flask route to display news in a web page."""
+PAGE_CACHE_TTL = 300 # Rendered pages are reused for 5 minutes
+# Pages are keyed on raw, unbounded query values, so they get their own small in-process
+# cache rather than evicting the headline entries that stale-while-revalidate relies on
+page_cache = SimpleCache(threshold=200, default_timeout=PAGE_CACHE_TTL)
+
+# Compile the page template at startup so the first request doesn't pay for it
+app.jinja_env.get_template("index.html")
+# Part of every page ETag, so a deploy that changes the template invalidates cached copies
+TEMPLATE_VERSION = hashlib.blake2b(
+    app.jinja_env.loader.get_source(app.jinja_env, "index.html")[0].encode(), digest_size=8
+).hexdigest()
+
+def get_request_params():
+    """Reads the news query parameters from the current request."""
     params = {
         "q": request.args.get("q"),
         "category": request.args.get("category"),
@@ -153,16 +439,85 @@ def news_web():
         "limit": request.args.get("limit", default=15, type=int)
     }
     params["limit"] = max(1, min(params["limit"], 100)) # Clamp limit
+    return params
+
+def set_cache_headers(resp, etag):
+    """Lets browsers and CDNs cache a response and revalidate it by ETag."""
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "public, max-age=300, stale-while-revalidate=60"
+    return resp
+
+def etag_matches(etag):
+    """Checks If-None-Match, including the ':<encoding>' suffixed ETags flask-compress sends."""
+    encodings = app.config["COMPRESS_ALGORITHM"]
+    return any(
+        request.if_none_match.contains(tag) for tag in (etag, *(f"{etag}:{enc}" for enc in encodings))
+    )
+
+def cacheable_response(body, etag, mimetype="text/html"):
+    """Wraps a body in a cacheable response, or answers 304 when the client is already current."""
+    # Checked by hand: make_conditional would buffer a streamed body, even for a 304
+    if etag_matches(etag):
+        return set_cache_headers(Response(status=304), etag)
+    return set_cache_headers(Response(body, mimetype=mimetype), etag)
+
+@app.route("/")
+def news_web():
+    """Flask route to display news in a web page."""
+    params = get_request_params()
     
+    # Serve an already rendered page for this exact request when we have one
+    page_key = make_cache_key("page", params)
+    cached_page = page_cache.get(page_key)
+    if cached_page:
+        etag, html = cached_page
+        return cacheable_response(html, etag)
+
     articles, error = fetch_headlines(**params)
     
-    return render_template(
+    # The page is fully determined by these values, so the ETag can be computed before
+    # rendering; a matching If-None-Match then skips the template entirely
+    etag_source = orjson.dumps([TEMPLATE_VERSION, articles, error, params], option=orjson.OPT_SORT_KEYS)
+    etag = hashlib.blake2b(etag_source, digest_size=16).hexdigest()
+    if etag_matches(etag):
+        return set_cache_headers(Response(status=304), etag)
+
+    # Stream the page so the <head> reaches the client while the article list renders
+    chunks = stream_template(
         "index.html",
         articles=articles,
         error=error,
         params=params, # Pass params to pre-fill the form
-        valid_categories=sorted(list(VALID_CATEGORIES)),
-        valid_countries=sorted(list(VALID_COUNTRY_CODES))
+        valid_categories=VALID_CATEGORIES_SORTED,
+        valid_countries=VALID_COUNTRY_CODES_SORTED
+    )
+    if error:
+        # Don't let browsers or CDNs hold on to a transient upstream failure
+        resp = Response(chunks, mimetype="text/html")
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+
+    def stream_and_cache():
+        rendered = []
+        for chunk in chunks:
+            rendered.append(chunk)
+            yield chunk
+        # Only reached once the whole page has been sent
+        page_cache.set(page_key, (etag, "".join(rendered)))
+
+    return cacheable_response(stream_and_cache(), etag)
+
+@app.route("/api/news.json")
+def news_json():
+    """Flask route returning the same news as JSON, serialized with orjson."""
+    params = get_request_params()
+    articles, error = fetch_headlines(**params)
+
+    body = orjson.dumps({"articles": articles, "error": error})
+    if error:
+        return Response(body, status=502, mimetype="application/json")
+    return cacheable_response(
+        body, hashlib.blake2b(body, digest_size=16).hexdigest(), mimetype="application/json"
     )
 
 # --- Main Execution ---
@@ -174,6 +529,7 @@ if __name__ == "__main__":
     )
     parser.add_argument("-q", "--query", help="Search for a keyword or phrase.")
     parser.add_argument("-c", "--category", help="News category (e.g., technology, sports).")
+    parser.add_argument("--categories", help="Comma-separated categories fetched together (e.g., technology,sports).")
     parser.add_argument("--country", help="Country code (2 letters, e.g., us, ro).")
     parser.add_argument("-l", "--language", default="en", help="Language of news (e.g., en, de, ro).")
     parser.add_argument("-n", "--limit", type=int, default=10, help="Number of headlines to fetch.")
@@ -182,7 +538,17 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     if args.web:
-        logging.info("Starting Flask web server on http://0.0.0.0:8000")
-        app.run(host="0.0.0.0", port=8000, debug=False) # Debug=False for production
+        app_dir = os.path.dirname(os.path.abspath(__file__))
+        # gunicorn.conf.py uses gevent workers, so both are needed
+        if os.name == "posix" and importlib.util.find_spec("gunicorn") and importlib.util.find_spec("gevent"):
+            logging.info("Starting gunicorn (gevent workers) on http://0.0.0.0:8000")
+            os.execv(sys.executable, [
+                sys.executable, "-m", "gunicorn", "--chdir", app_dir,
+                "-c", os.path.join(app_dir, "gunicorn.conf.py"), "newsapp:app",
+            ])
+        # Fallback where gunicorn/gevent aren't available (e.g. Windows)
+        logging.info("gunicorn/gevent not available, starting Flask web server on http://0.0.0.0:8000")
+        start_cache_warming()
+        app.run(host="0.0.0.0", port=8000, debug=False)
     else:
         run_terminal_mode(args)
\ No newline at end of file